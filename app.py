@@ -3,9 +3,12 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from scipy.stats import norm
-from scipy.optimize import brentq
-from datetime import datetime, timedelta
+from scipy.special import ndtr
+from scipy.optimize import brenth
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import json
+import re
 import yfinance as yf
 
 __author__ = "https://github.com/theredplanetsings"
@@ -13,86 +16,352 @@ __date__ = "20/6/2025"
 
 st.set_page_config(page_title="Options & Volatility Dashboard", layout="wide")
 
+# Standard normal pdf normalising constant, 1/sqrt(2*pi)
+_INV_SQRT_2PI = 1.0 / np.sqrt(2 * np.pi)
+
+# Surface grid sizes as (strike points, time points); Plotly interpolates between cells
+SURFACE_RESOLUTIONS = {"Coarse": (10, 8), "Medium": (15, 12), "Fine": (25, 20), "Detailed": (40, 30)}
+
+# On-disk stock data cache shared across sessions and restarts; entries last for the current UTC hour
+STOCK_CACHE_DIR = Path.home() / ".cache" / "options_dashboard"
+
+def _stock_cache_path(symbol):
+    """Path of the on-disk cache file for a symbol"""
+    return STOCK_CACHE_DIR / f"{re.sub(r'[^A-Za-z0-9._^-]', '_', symbol)}.json"
+
+def _load_cached_stock_data(symbol):
+    """Return this hour's cached (price, name, vol) for a symbol, or None"""
+    try:
+        entry = json.loads(_stock_cache_path(symbol).read_text())
+        if entry['hour'] != f"{datetime.now(timezone.utc):%Y-%m-%d-%H}":
+            return None
+        current_price, company_name, historical_vol = entry['data']
+    except (OSError, ValueError, KeyError, TypeError):
+        # Unreadable or malformed files are treated as a miss and rewritten after the fetch
+        return None
+    return current_price, company_name, historical_vol
+
+def _save_cached_stock_data(symbol, current_price, company_name, historical_vol):
+    """Persist (price, name, vol) for a symbol; failures only mean a cache miss next time"""
+    try:
+        STOCK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _stock_cache_path(symbol).write_text(json.dumps({
+            'hour': f"{datetime.now(timezone.utc):%Y-%m-%d-%H}",
+            'data': [float(current_price), company_name, None if historical_vol is None else float(historical_vol)]
+        }))
+    except (OSError, TypeError, ValueError):
+        pass
+
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def get_stock_data(symbol):
-    """Fetch current stock price and basic info using yfinance"""
+    """Fetch current stock price and basic info using yfinance, backed by an hourly disk cache"""
+    cached = _load_cached_stock_data(symbol)
+    if cached is not None:
+        return cached
+    
     try:
         ticker = yf.Ticker(symbol)
-        info = ticker.info
-        hist = ticker.history(period="1d")
+        # One 30-day request covers both the latest close and the volatility estimate
+        hist = ticker.history(period="30d")
         
         if hist.empty:
             return None, None, None
         
-        current_price = hist['Close'].iloc[-1]
-        company_name = info.get('longName', symbol)
+        # Days without a close are dropped so a gap cannot turn the volatility into NaN
+        closes = hist['Close'].dropna().to_numpy()
+        if closes.size == 0:
+            return None, None, None
+        current_price = closes[-1]
+        
+        # The chart metadata returned alongside the history usually carries the company
+        # name, avoiding the much larger fundamentals request behind ticker.info
+        try:
+            company_name = ticker.get_history_metadata().get('longName')
+        except Exception:
+            company_name = None
+        if not company_name:
+            company_name = ticker.info.get('longName', symbol)
         
         # Try to get some basic volatility estimate from recent data
-        hist_30d = ticker.history(period="30d")
-        if len(hist_30d) > 1:
-            returns = np.log(hist_30d['Close'] / hist_30d['Close'].shift(1)).dropna()
-            historical_vol = returns.std() * np.sqrt(252)  # Annualized volatility
+        if len(closes) > 1:
+            returns = np.diff(np.log(closes))
+            historical_vol = returns.std(ddof=1) * np.sqrt(252)  # Annualized volatility
         else:
             historical_vol = None
-            
+        
+        _save_cached_stock_data(symbol, current_price, company_name, historical_vol)
         return current_price, company_name, historical_vol
     except Exception as e:
         st.error(f"Error fetching data for {symbol}: {str(e)}")
         return None, None, None
 
+def _norm_pdf(x):
+    """Standard normal pdf, inlined to avoid scipy.stats distribution overhead"""
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
 def black_scholes_call(S, K, T, r, sigma):
-    """Calculate Black-Scholes call option price"""
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    call_price = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+    """Calculate Black-Scholes call option price (scalars or broadcastable arrays)"""
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    call_price = S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
     return call_price
 
 def black_scholes_put(S, K, T, r, sigma):
-    """Calculate Black-Scholes put option price"""
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    put_price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+    """Calculate Black-Scholes put option price (scalars or broadcastable arrays)"""
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    put_price = K * np.exp(-r * T) * ndtr(-d2) - S * ndtr(-d1)
     return put_price
 
 def implied_volatility(option_price, S, K, T, r, option_type='call'):
-    """Calculate implied volatility using Brent's method"""
+    """Calculate implied volatility using Newton-Raphson, falling back to Brent's method"""
+    # No volatility reproduces a price outside the no-arbitrage bounds, so skip the solver
+    if T <= 0 or option_price <= 0:
+        return np.nan
+    discounted_K = K * np.exp(-r * T)
+    if option_type == 'call':
+        lower_bound, upper_bound = max(S - discounted_K, 0.0), S
+    else:
+        lower_bound, upper_bound = max(discounted_K - S, 0.0), discounted_K
+    if option_price < lower_bound - 1e-10 or option_price > upper_bound + 1e-10:
+        return np.nan
+    
+    # Terms that don't depend on sigma are computed once, not per iteration, leaving
+    # d1 = (log(S/K) + rT + sigma^2 T/2) / (sigma sqrt(T)) as a few multiply-adds
+    sqrt_T = np.sqrt(T)
+    log_SK = np.log(S / K)
+    forward_log_moneyness = log_SK + r * T
+    half_T = 0.5 * T
+    
+    def d1_d2(sigma):
+        sigma_sqrt_T = sigma * sqrt_T
+        d1 = (forward_log_moneyness + half_T * sigma * sigma) / sigma_sqrt_T
+        return d1, d1 - sigma_sqrt_T
+    
     def objective(sigma):
+        d1, d2 = d1_d2(sigma)
         if option_type == 'call':
-            return black_scholes_call(S, K, T, r, sigma) - option_price
+            return S * ndtr(d1) - discounted_K * ndtr(d2) - option_price
         else:
-            return black_scholes_put(S, K, T, r, sigma) - option_price
+            return discounted_K * ndtr(-d2) - S * ndtr(-d1) - option_price
+    
+    def objective_and_vega(sigma):
+        # Price error and vega share d1, so each Newton step prices the option once
+        d1, d2 = d1_d2(sigma)
+        if option_type == 'call':
+            price = S * ndtr(d1) - discounted_K * ndtr(d2)
+        else:
+            price = discounted_K * ndtr(-d2) - S * ndtr(-d1)
+        return price - option_price, S * _norm_pdf(d1) * sqrt_T
+    
+    # Brenner-Subrahmanyam ATM approximation, also used to bracket the fallback search
+    sigma0 = np.sqrt(2 * np.pi / T) * option_price / S
+    
+    # Newton-Raphson on the analytic vega converges in a handful of steps when started at
+    # the inflection point of price in sigma (Manaster-Koehler); at the money that point
+    # is zero, so start from the ATM approximation instead
+    sigma_inflection = np.sqrt(2 * abs(forward_log_moneyness) / T)
+    sigma = sigma_inflection if sigma_inflection > 0.001 else sigma0
+    with np.errstate(all='ignore'):
+        for _ in range(50):
+            diff, vega = objective_and_vega(sigma)
+            if not vega > 0:
+                break
+            step = diff / vega
+            sigma -= step
+            if abs(step) < 1e-6 or not 0 < sigma <= 5.0:
+                break
+    if 0.001 <= sigma <= 5.0 and abs(objective(sigma)) < 1e-6:
+        return sigma
+    
+    # Newton can stall where vega vanishes, so fall back to a bracketed search,
+    # trying a tight bracket around the estimate before the full range
+    try:
+        return brenth(objective, max(0.001, 0.3 * sigma0), min(5.0, 3.0 * sigma0), xtol=1e-6, rtol=1e-6)
+    except ValueError:
+        pass
     
     try:
-        return brentq(objective, 0.001, 5.0)
+        return brenth(objective, 0.001, 5.0, xtol=1e-6, rtol=1e-6)
     except ValueError:
         return np.nan
 
+def _chandrupatla(f, a, b, xtol=1e-10, max_iter=100):
+    """Find roots of a vectorised function on brackets [a, b] with Chandrupatla's method (NaN if not bracketed)"""
+    fa, fb = f(a), f(b)
+    root = np.where(fa == 0, a, np.where(fb == 0, b, np.nan))
+    active = (np.sign(fa) * np.sign(fb) < 0)
+    xm = np.where(np.abs(fa) < np.abs(fb), a, b)
+    c, fc = a, fa
+    t = np.full(a.shape, 0.5)
+    
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        # Evaluate the next point and keep the sub-interval that still brackets the root
+        xt = a + t * (b - a)
+        ft = f(xt)
+        same_sign = np.sign(ft) == np.sign(fa)
+        c, fc = np.where(same_sign, a, b), np.where(same_sign, fa, fb)
+        b, fb = np.where(same_sign, b, a), np.where(same_sign, fb, fa)
+        a, fa = xt, ft
+        
+        # Best estimate so far and convergence check
+        a_is_best = np.abs(fa) < np.abs(fb)
+        xm, fm = np.where(a_is_best, a, b), np.where(a_is_best, fa, fb)
+        tlim = (2 * np.finfo(float).eps * np.abs(xm) + 0.5 * xtol) / np.abs(b - c)
+        done = active & ((fm == 0) | (tlim > 0.5))
+        root = np.where(done, xm, root)
+        active &= ~done
+        
+        # Inverse quadratic interpolation where it is safe, bisection otherwise
+        with np.errstate(all='ignore'):
+            xi = (a - b) / (c - b)
+            phi = (fa - fb) / (fc - fb)
+            use_iqi = (phi ** 2 < xi) & ((1 - phi) ** 2 < 1 - xi)
+            t_iqi = fa / (fb - fa) * fc / (fb - fc) + (c - a) / (b - a) * fa / (fc - fa) * fb / (fc - fb)
+        t = np.clip(np.where(use_iqi, t_iqi, 0.5), tlim, 1 - tlim)
+    
+    return np.where(active, xm, root)
+
+def implied_volatility_vec(option_prices, S, K, T, r, option_type='call', tol=1e-6, max_iter=50):
+    """Calculate implied volatilities for arrays of option prices with vectorised Newton-Raphson and a bracketed fallback"""
+    option_prices, S, K, T, r = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (option_prices, S, K, T, r)))
+    # Solve on flat arrays so scalar quotes can be indexed like any batch, then restore the shape
+    shape = option_prices.shape
+    option_prices, S, K, T, r = (np.ravel(a) for a in (option_prices, S, K, T, r))
+    pricer = black_scholes_call if option_type == 'call' else black_scholes_put
+    
+    with np.errstate(all='ignore'):
+        # Quotes failing implied_volatility's checks (or with NaN inputs) stay NaN and skip the solver
+        discounted_K = K * np.exp(-r * T)
+        if option_type == 'call':
+            lower_bound, upper_bound = np.maximum(S - discounted_K, 0.0), S
+        else:
+            lower_bound, upper_bound = np.maximum(discounted_K - S, 0.0), discounted_K
+        valid = ((T > 0) & (S > 0) & (K > 0) & (option_prices > 0) &
+                 (option_prices >= lower_bound - 1e-10) & (option_prices <= upper_bound + 1e-10))
+        implied_vols = np.full(option_prices.shape, np.nan)
+        option_prices, S, K, T, r = (x[valid] for x in (option_prices, S, K, T, r))
+        sqrt_T = np.sqrt(T)
+        
+        # Same inflection-point / ATM seed as implied_volatility
+        sigma_inflection = np.sqrt(2 * np.abs(np.log(S / K) + r * T) / T)
+        sigma_atm = np.sqrt(2 * np.pi / T) * option_prices / S
+        sigma = np.clip(np.where(sigma_inflection > 0.001, sigma_inflection, sigma_atm), 0.001, 5.0)
+        
+        for _ in range(max_iter):
+            diff = pricer(S, K, T, r, sigma) - option_prices
+            if np.all(np.abs(diff) < tol):
+                break
+            sigma_sqrt_T = sigma * sqrt_T
+            d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+            vega = S * _norm_pdf(d1) * sqrt_T
+            sigma = np.clip(sigma - diff / np.maximum(vega, 1e-8), 0.001, 5.0)
+        diff = pricer(S, K, T, r, sigma) - option_prices
+        
+        # Quotes Newton could not settle fall back to a batched bracketed search
+        stalled = ~(np.abs(diff) < tol)
+        if stalled.any():
+            prices_s, S_s, K_s, T_s, r_s = (x[stalled] for x in (option_prices, S, K, T, r))
+            sigma[stalled] = _chandrupatla(
+                lambda sig: pricer(S_s, K_s, T_s, r_s, sig) - prices_s,
+                np.full(prices_s.shape, 0.001), np.full(prices_s.shape, 5.0)
+            )
+            diff = pricer(S, K, T, r, sigma) - option_prices
+    
+    implied_vols[valid] = np.where(np.abs(diff) < tol, sigma, np.nan)
+    return implied_vols.reshape(shape)
+
+def bs_all(S, K, T, r, sigma):
+    """Calculate call and put prices and Greeks together, sharing d1, d2, the pdf and the discount factor"""
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+    d2 = d1 - sigma_sqrt_T
+    discounted_K = K * np.exp(-r * T)
+    nd1 = _norm_pdf(d1)
+    S_nd1 = S * nd1
+    
+    # The volatility part of time decay is the same for calls and puts
+    theta_vol = -S_nd1 * sigma / (2 * sqrt_T)
+    
+    # Each side keeps its own tail of the cdf rather than using 1 - N(x), which loses
+    # precision for deep out-of-the-money options
+    Nd1, Nd2 = ndtr(d1), ndtr(d2)
+    N_minus_d1, N_minus_d2 = ndtr(-d1), ndtr(-d2)
+    
+    return {
+        'call': S * Nd1 - discounted_K * Nd2,
+        'put': discounted_K * N_minus_d2 - S * N_minus_d1,
+        'delta_call': Nd1,
+        'delta_put': -N_minus_d1,
+        'gamma': nd1 / (S * sigma_sqrt_T),
+        'theta_call': (theta_vol - r * discounted_K * Nd2) / 365,
+        'theta_put': (theta_vol + r * discounted_K * N_minus_d2) / 365,
+        'vega': S_nd1 * sqrt_T / 100
+    }
+
+def bs_price_and_greeks(S, K, T, r, sigma, option_type='call'):
+    """Calculate option price and Greeks for one side of the bs_all pass"""
+    result = bs_all(S, K, T, r, sigma)
+    side = 'call' if option_type == 'call' else 'put'
+    return {'price': result[side], 'delta': result[f'delta_{side}'], 'gamma': result['gamma'],
+            'theta': result[f'theta_{side}'], 'vega': result['vega']}
+
 def option_greeks(S, K, T, r, sigma, option_type='call'):
     """Calculate option Greeks"""
-    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
+    result = bs_price_and_greeks(S, K, T, r, sigma, option_type)
+    return {greek: result[greek] for greek in ('delta', 'gamma', 'theta', 'vega')}
+
+def option_greeks_vec(S, K, T, r, sigma, option_type='call'):
+    """Calculate option Greeks for arrays of inputs as one (4, N) array of delta, gamma, theta and vega"""
+    S, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, r, sigma)))
+    result = bs_price_and_greeks(S, K, T, r, sigma, option_type)
+    return np.stack([result[greek] for greek in ('delta', 'gamma', 'theta', 'vega')])
+
+@st.cache_data(max_entries=64)  # Bounded: every slider position is a new key
+def _bs_price_surface(S, r, sigma, strike_min, strike_max, time_min, time_max, option_type, n_k=15, n_t=12):
+    """Compute the Black-Scholes price surface over a strike/time grid"""
+    # float32 is ample for a plotted surface and halves the arithmetic and payload size
+    strikes = np.linspace(S * strike_min/100, S * strike_max/100, n_k, dtype=np.float32)
+    times = np.linspace(time_min/365, time_max/365, n_t, dtype=np.float32)
     
-    # Delta
-    if option_type == 'call':
-        delta = norm.cdf(d1)
+    # The pricing functions are NumPy ufunc compositions, so passing a strike
+    # row and a time column evaluates the whole grid in one vectorised pass.
+    # Strike-only and time-only terms (log(S/K), sqrt(T), exp(-rT)) stay 1-D
+    # and only the combined d1/d2/price arrays are materialised in 2-D.
+    K_row, T_col = strikes[np.newaxis, :], times[:, np.newaxis]
+    if option_type == "Call":
+        surface_data = black_scholes_call(S, K_row, T_col, r, sigma)
     else:
-        delta = norm.cdf(d1) - 1
+        surface_data = black_scholes_put(S, K_row, T_col, r, sigma)
     
-    # Gamma
-    gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
+    return strikes, times, surface_data.astype(np.float32, copy=False)
+
+@st.cache_data(max_entries=64)
+def _vol_surface(spot, strike_min, strike_max, days_min, days_max, base_vol, skew, smile, term_structure, n_k=15, n_t=12):
+    """Compute the market implied volatility surface with smile, skew and term structure"""
+    strikes = np.linspace(spot * strike_min/100, spot * strike_max/100, n_k, dtype=np.float32)
+    days = np.linspace(days_min, days_max, n_t, dtype=np.float32)
+    # Calculate moneyness (log-strike relative to spot) along the strike axis
+    moneyness = np.log(strikes / spot)
     
-    # Theta
-    if option_type == 'call':
-        theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T)) - 
-                r * K * np.exp(-r * T) * norm.cdf(d2)) / 365
-    else:
-        theta = (-S * norm.pdf(d1) * sigma / (2 * np.sqrt(T)) + 
-                r * K * np.exp(-r * T) * norm.cdf(-d2)) / 365
+    # Time factor for term structure along the expiry axis
+    time_factor = np.sqrt(days / 365)
+    
+    # Market volatility model with smile/skew, broadcast to (days, strikes)
+    vol = ((base_vol + 
+           skew * moneyness + 
+           smile * moneyness**2)[np.newaxis, :] +
+          (term_structure * time_factor)[:, np.newaxis])
     
-    # Vega
-    vega = S * norm.pdf(d1) * np.sqrt(T) / 100
+    # Ensure volatility is positive
+    vol_surface = np.maximum(vol, 0.05)  # Minimum 5% vol
     
-    return {'delta': delta, 'gamma': gamma, 'theta': theta, 'vega': vega}
+    return strikes, days, vol_surface.astype(np.float32, copy=False)
 
 def black_scholes_calculator():
     st.header("Black-Scholes Option Pricing Calculator")
@@ -139,22 +408,21 @@ def black_scholes_calculator():
             default_price = 100.0
             default_vol = 0.20
         
-        st.markdown("**Option Parameters**")
-        S = st.number_input(price_label, value=default_price, min_value=0.01)
-        K = st.number_input("Strike Price ($)", value=default_price, min_value=0.01)
-        T = st.number_input("Time to Expiration (years)", value=0.25, min_value=0.001)
-        r = st.number_input("Risk-free Rate (%)", value=5.0, min_value=0.0) / 100
-        sigma = st.number_input("Volatility (%)", value=default_vol*100, min_value=0.1) / 100
-        option_type = st.radio("Option Type", ["Call", "Put"])
+        # A form applies edits to several inputs in one rerun instead of one per keystroke
+        with st.form("bs_inputs_form"):
+            st.markdown("**Option Parameters**")
+            S = st.number_input(price_label, value=default_price, min_value=0.01)
+            K = st.number_input("Strike Price ($)", value=default_price, min_value=0.01)
+            T = st.number_input("Time to Expiration (years)", value=0.25, min_value=0.001)
+            r = st.number_input("Risk-free Rate (%)", value=5.0, min_value=0.0) / 100
+            sigma = st.number_input("Volatility (%)", value=default_vol*100, min_value=0.1) / 100
+            option_type = st.radio("Option Type", ["Call", "Put"])
+            st.form_submit_button("Calculate")
     
     with col2:
         st.subheader("Results")
-        if option_type == "Call":
-            price = black_scholes_call(S, K, T, r, sigma)
-        else:
-            price = black_scholes_put(S, K, T, r, sigma)
-        
-        greeks = option_greeks(S, K, T, r, sigma, option_type.lower())
+        greeks = bs_price_and_greeks(S, K, T, r, sigma, option_type.lower())
+        price = greeks['price']
         
         st.metric("Option Price", f"${price:.4f}")
         st.metric("Delta", f"{greeks['delta']:.4f}")
@@ -164,6 +432,11 @@ def black_scholes_calculator():
     
     st.divider()
     
+    _render_surface(S, K, T, r, sigma, price, option_type, stock_symbol)
+
+@st.fragment
+def _render_surface(S, K, T, r, sigma, price, option_type, stock_symbol):
+    """Render the Black-Scholes surface section; its widgets rerun only this fragment"""
     # Black-Scholes Surfaces
     st.subheader("Black-Scholes Model Surfaces")
     
@@ -176,106 +449,118 @@ def black_scholes_calculator():
         key="surface_type_selector"
     )
     
-    # Surface parameters
-    col_params1, col_params2, col_params3 = st.columns(3)
-    with col_params1:
-        strike_range = st.slider("Strike Range (% of spot)", 50, 150, (80, 120), key="bs_strike_range")
-    with col_params2:
-        time_range = st.slider("Time Range (days)", 1, 365, (7, 90), key="bs_time_range")
-    with col_params3:
-        show_current_point = st.checkbox("Show Current Option", value=True, key="bs_show_point")
+    # Surface parameters, grouped in a form so tuning several of them rebuilds the surface once
+    with st.form("bs_surface_form"):
+        col_params1, col_params2, col_params3 = st.columns(3)
+        with col_params1:
+            strike_range = st.slider("Strike Range (% of spot)", 50, 150, (80, 120), key="bs_strike_range")
+        with col_params2:
+            time_range = st.slider("Time Range (days)", 1, 365, (7, 90), key="bs_time_range")
+        with col_params3:
+            resolution = st.select_slider("Surface Resolution", list(SURFACE_RESOLUTIONS), value="Medium", key="bs_resolution")
+            show_current_point = st.checkbox("Show Current Option", value=True, key="bs_show_point")
+        st.form_submit_button("Update Surface")
     
     # Generate surface data
     strike_min, strike_max = strike_range
     time_min, time_max = time_range
+    n_strikes, n_times = SURFACE_RESOLUTIONS[resolution]
     
-    strikes = np.linspace(S * strike_min/100, S * strike_max/100, 25)
-    times = np.linspace(time_min/365, time_max/365, 20)
-    
-    # Create container for the plot that will be updated
-    plot_container = st.empty()
+    # Build the figure skeleton once per session; later reruns only patch
+    # the trace data and titles instead of rebuilding and revalidating it
+    if 'bs_surface_fig' not in st.session_state:
+        skeleton = go.Figure()
+        skeleton.add_trace(go.Surface(showscale=True))
+        skeleton.add_trace(go.Scatter3d(
+            mode='markers',
+            marker=dict(
+                size=12,
+                color='red',
+                symbol='diamond',
+                line=dict(color='darkred', width=2)
+            ),
+            showlegend=True
+        ))
+        skeleton.update_layout(
+            scene=dict(
+                xaxis_title='Strike Price ($)',
+                yaxis_title='Days to Expiration',
+                camera=dict(
+                    eye=dict(x=1.5, y=1.5, z=1.5)
+                )
+            ),
+            height=600,
+            margin=dict(l=0, r=0, b=0, t=80),
+            # Add animation configuration for smoother transitions
+            transition=dict(
+                duration=300,
+                easing="cubic-in-out"
+            )
+        )
+        st.session_state.bs_surface_fig = skeleton
+    fig = st.session_state.bs_surface_fig
     
-    with plot_container.container():
+    # The session's figure already shows these inputs if they are unchanged
+    # (e.g. after switching tools and back), so only patch it when they differ
+    fig_params = (surface_type, option_type, S, K, T, r, sigma, stock_symbol,
+                  strike_range, time_range, resolution, show_current_point)
+    if st.session_state.get('bs_surface_fig_params') != fig_params:
         if surface_type == "Price Surface":
-            surface_data = np.zeros((len(times), len(strikes)))
-            for i, time in enumerate(times):
-                for j, strike in enumerate(strikes):
-                    if option_type == "Call":
-                        surface_data[i, j] = black_scholes_call(S, strike, time, r, sigma)
-                    else:
-                        surface_data[i, j] = black_scholes_put(S, strike, time, r, sigma)
+            strikes, times, surface_data = _bs_price_surface(
+                S, r, sigma, strike_min, strike_max, time_min, time_max, option_type, n_strikes, n_times
+            )
             z_title = "Option Price ($)"
             surface_title = f'Black-Scholes {option_type} Option Price Surface'
             current_z = price
             colorscale = 'Viridis'
         else:  # Volatility Surface
             # In Black-Scholes, volatility is constant across all strikes and times
-            surface_data = np.full((len(times), len(strikes)), sigma * 100)
+            strikes = np.linspace(S * strike_min/100, S * strike_max/100, n_strikes, dtype=np.float32)
+            times = np.linspace(time_min/365, time_max/365, n_times, dtype=np.float32)
+            surface_data = np.full((len(times), len(strikes)), sigma * 100, dtype=np.float32)
             z_title = "Volatility (%)"
             surface_title = f'Black-Scholes Volatility Surface (Constant σ = {sigma*100:.1f}%)'
             current_z = sigma * 100
             colorscale = 'Blues'
         
-        # Create 3D surface plot
-        fig = go.Figure()
-        
-        # Add surface
-        fig.add_trace(go.Surface(
+        # Update surface
+        fig.update_traces(
             x=strikes,
             y=times * 365,  # Convert back to days for display
             z=surface_data,
             colorscale=colorscale,
-            showscale=True,
             name=f"{option_type} {surface_type}",
-            hovertemplate=f'<b>Strike:</b> $%{{x:.2f}}<br><b>Days:</b> %{{y:.0f}}<br><b>{z_title}:</b> %{{z:.4f}}<extra></extra>'
-        ))
+            hovertemplate=f'<b>Strike:</b> $%{{x:.2f}}<br><b>Days:</b> %{{y:.0f}}<br><b>{z_title}:</b> %{{z:.4f}}<extra></extra>',
+            selector=dict(type='surface')
+        )
         
-        # Add current option point if checkbox is selected
-        if show_current_point:
-            fig.add_trace(go.Scatter3d(
-                x=[K],
-                y=[T * 365],  # Convert to days
-                z=[current_z],
-                mode='markers',
-                marker=dict(
-                    size=12,
-                    color='red',
-                    symbol='diamond',
-                    line=dict(color='darkred', width=2)
-                ),
-                name=f"Current {option_type}",
-                showlegend=True,
-                hovertemplate=f'<b>Current {option_type}</b><br>Strike: ${K:.2f}<br>Days: {T*365:.0f}<br>{z_title}: {current_z:.4f}<extra></extra>'
-            ))
+        # Update current option point, hidden unless the checkbox is selected
+        fig.update_traces(
+            x=[K],
+            y=[T * 365],  # Convert to days
+            z=[current_z],
+            visible=show_current_point,
+            name=f"Current {option_type}",
+            hovertemplate=f'<b>Current {option_type}</b><br>Strike: ${K:.2f}<br>Days: {T*365:.0f}<br>{z_title}: {current_z:.4f}<extra></extra>',
+            selector=dict(type='scatter3d')
+        )
         
         fig.update_layout(
             title=f'{surface_title}{f" - {stock_symbol}" if stock_symbol else ""}<br>Spot: ${S:.2f}, Vol: {sigma*100:.1f}%, Rate: {r*100:.1f}%',
-            scene=dict(
-                xaxis_title='Strike Price ($)',
-                yaxis_title='Days to Expiration',
-                zaxis_title=z_title,
-                camera=dict(
-                    eye=dict(x=1.5, y=1.5, z=1.5)
-                )
-            ),
-            height=600,
-            margin=dict(l=0, r=0, b=0, t=80),
-            # Add animation configuration for smoother transitions
-            transition=dict(
-                duration=300,
-                easing="cubic-in-out"
-            )
+            scene_zaxis_title=z_title
         )
         
-        st.plotly_chart(fig, use_container_width=True, key=f"surface_plot_{surface_type}")
-        
-        # Educational note about volatility surface
-        if surface_type == "Volatility Surface":
-            st.info(
-                "Educational Note: In the Black-Scholes model, volatility is assumed to be constant across all strikes and expiration dates. "
-                "This is why the volatility surface is completely flat. In reality, market-observed implied volatilities show patterns like volatility smile/skew. "
-                "Check the 'Volatility Surface' tab to see realistic implied volatility patterns."
-            )
+        st.session_state.bs_surface_fig_params = fig_params
+    
+    st.plotly_chart(fig, use_container_width=True, key=f"surface_plot_{surface_type}")
+    
+    # Educational note about volatility surface
+    if surface_type == "Volatility Surface":
+        st.info(
+            "Educational Note: In the Black-Scholes model, volatility is assumed to be constant across all strikes and expiration dates. "
+            "This is why the volatility surface is completely flat. In reality, market-observed implied volatilities show patterns like volatility smile/skew. "
+            "Check the 'Volatility Surface' tab to see realistic implied volatility patterns."
+        )
 
 def implied_volatility_calculator():
     st.header("Implied Volatility Calculator")
@@ -320,13 +605,15 @@ def implied_volatility_calculator():
             market_price_label = "Market Option Price ($)"
             iv_default_price = 100.0
         
-        st.markdown("**Option Parameters**")
-        market_price = st.number_input(market_price_label, value=5.0, min_value=0.01)
-        S = st.number_input(iv_price_label, value=iv_default_price, min_value=0.01, key="iv_S")
-        K = st.number_input("Strike Price ($)", value=iv_default_price, min_value=0.01, key="iv_K")
-        T = st.number_input("Time to Expiration (years)", value=0.25, min_value=0.001, key="iv_T")
-        r = st.number_input("Risk-free Rate (%)", value=5.0, min_value=0.0, key="iv_r") / 100
-        option_type = st.radio("Option Type", ["Call", "Put"], key="iv_type")
+        with st.form("iv_inputs_form"):
+            st.markdown("**Option Parameters**")
+            market_price = st.number_input(market_price_label, value=5.0, min_value=0.01)
+            S = st.number_input(iv_price_label, value=iv_default_price, min_value=0.01, key="iv_S")
+            K = st.number_input("Strike Price ($)", value=iv_default_price, min_value=0.01, key="iv_K")
+            T = st.number_input("Time to Expiration (years)", value=0.25, min_value=0.001, key="iv_T")
+            r = st.number_input("Risk-free Rate (%)", value=5.0, min_value=0.0, key="iv_r") / 100
+            option_type = st.radio("Option Type", ["Call", "Put"], key="iv_type")
+            st.form_submit_button("Calculate")
     
     with col2:
         st.subheader("Results")
@@ -345,6 +632,50 @@ def implied_volatility_calculator():
             st.metric("Price Difference", f"${abs(market_price - theoretical_price):.4f}")
         else:
             st.error("Could not calculate implied volatility. Check input parameters.")
+    
+    # Batch quotes are solved together by the vectorised solver rather than one at a time
+    st.divider()
+    st.subheader("Batch Implied Volatility")
+    st.markdown("*Each quote uses the stock price and risk-free rate above; the example rows are priced at 20% volatility around that spot*")
+    example_strikes = np.round(S * np.array([0.9, 1.0, 1.1, 1.0]), 2)
+    example_prices = bs_all(S, example_strikes, 0.25, r, 0.2)
+    quotes = st.data_editor(
+        pd.DataFrame({
+            "Strike": example_strikes,
+            "Expiry (years)": [0.25, 0.25, 0.25, 0.25],
+            "Type": ["Call", "Call", "Call", "Put"],
+            "Option Price": np.round(np.where([True, True, True, False], example_prices['call'], example_prices['put']), 2)
+        }),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={"Type": st.column_config.SelectboxColumn(options=["Call", "Put"], required=True)},
+        key="iv_batch_quotes"
+    ).dropna()
+    
+    if not quotes.empty:
+        strikes = quotes["Strike"].to_numpy(dtype=float)
+        expiries = quotes["Expiry (years)"].to_numpy(dtype=float)
+        batch_iv = np.full(len(quotes), np.nan)
+        batch_greeks = np.full((4, len(quotes)), np.nan)
+        for quote_type in ("Call", "Put"):
+            rows = (quotes["Type"] == quote_type).to_numpy()
+            if rows.any():
+                batch_iv[rows] = implied_volatility_vec(
+                    quotes["Option Price"].to_numpy(dtype=float)[rows], S, strikes[rows], expiries[rows],
+                    r, quote_type.lower()
+                )
+                # Greeks only exist where a volatility was found, which also rules out bad strikes and expiries
+                solved = rows & np.isfinite(batch_iv)
+                if solved.any():
+                    batch_greeks[:, solved] = option_greeks_vec(
+                        S, strikes[solved], expiries[solved], r, batch_iv[solved], quote_type.lower()
+                    )
+        st.dataframe(
+            quotes.assign(**{"Implied Volatility (%)": batch_iv * 100},
+                          **dict(zip(("Delta", "Gamma", "Theta", "Vega"), batch_greeks))),
+            use_container_width=True,
+            hide_index=True
+        )
 
 def volatility_surface():
     st.header("Market Implied Volatility Surface")
@@ -392,81 +723,83 @@ def volatility_surface():
             market_default_price = 100.0
             market_default_vol = 20
         
-        st.markdown("**Price Parameters**")
-        market_spot = st.number_input(market_price_label, value=market_default_price, min_value=0.01, key="market_spot")
-        
-        # Strike range
-        market_strike_min = st.number_input("Min Strike (%)", value=80, min_value=1, key="market_strike_min")
-        market_strike_max = st.number_input("Max Strike (%)", value=120, min_value=1, key="market_strike_max")
-        
-        # Time range
-        market_days_min = st.number_input("Min Days to Expiry", value=7, min_value=1, key="market_days_min")
-        market_days_max = st.number_input("Max Days to Expiry", value=365, min_value=1, key="market_days_max")
-        
-        st.divider()
-        st.subheader("Volatility Smile Parameters")
-        
-        # Volatility smile parameters
-        market_base_vol = st.slider("Base Volatility (%)", 10, 50, market_default_vol, key="market_base_vol") / 100
-        market_skew = st.slider("Volatility Skew", -0.1, 0.1, -0.02, 0.01, key="market_skew", 
-                               help="Negative skew means OTM puts have higher IV than OTM calls")
-        market_smile = st.slider("Volatility Smile", 0.0, 0.1, 0.02, 0.01, key="market_smile",
-                                help="Positive smile means both OTM puts and calls have higher IV")
-        
-        # Term structure effect
-        term_structure = st.slider("Term Structure Effect", -0.05, 0.05, 0.01, 0.005, key="market_term_structure",
-                                  help="How volatility changes with time to expiration")
+        # Everything below only feeds the surface, so a form applies edits in a single rerun
+        with st.form("market_surface_form"):
+            st.markdown("**Price Parameters**")
+            market_spot = st.number_input(market_price_label, value=market_default_price, min_value=0.01, key="market_spot")
+            
+            # Strike range
+            market_strike_min = st.number_input("Min Strike (%)", value=80, min_value=1, key="market_strike_min")
+            market_strike_max = st.number_input("Max Strike (%)", value=120, min_value=1, key="market_strike_max")
+            
+            # Time range
+            market_days_min = st.number_input("Min Days to Expiry", value=7, min_value=1, key="market_days_min")
+            market_days_max = st.number_input("Max Days to Expiry", value=365, min_value=1, key="market_days_max")
+            
+            market_resolution = st.select_slider("Surface Resolution", list(SURFACE_RESOLUTIONS), value="Medium", key="market_resolution")
+            
+            st.divider()
+            st.subheader("Volatility Smile Parameters")
+            
+            # Volatility smile parameters
+            market_base_vol = st.slider("Base Volatility (%)", 10, 50, market_default_vol, key="market_base_vol") / 100
+            market_skew = st.slider("Volatility Skew", -0.1, 0.1, -0.02, 0.01, key="market_skew", 
+                                   help="Negative skew means OTM puts have higher IV than OTM calls")
+            market_smile = st.slider("Volatility Smile", 0.0, 0.1, 0.02, 0.01, key="market_smile",
+                                    help="Positive smile means both OTM puts and calls have higher IV")
+            
+            # Term structure effect
+            term_structure = st.slider("Term Structure Effect", -0.05, 0.05, 0.01, 0.005, key="market_term_structure",
+                                      help="How volatility changes with time to expiration")
+            
+            st.form_submit_button("Update Surface")
     
     with col2:
-        # Generate market volatility surface data
-        market_strikes = np.linspace(market_spot * market_strike_min/100, market_spot * market_strike_max/100, 25)
-        market_days = np.linspace(market_days_min, market_days_max, 20)
-        
-        market_vol_surface = np.zeros((len(market_days), len(market_strikes)))
-        
-        for i, day in enumerate(market_days):
-            for j, strike in enumerate(market_strikes):
-                # Calculate moneyness (log-strike relative to spot)
-                moneyness = np.log(strike / market_spot)
-                
-                # Time factor for term structure
-                time_factor = np.sqrt(day / 365)
-                
-                # Market volatility model with smile/skew
-                vol = (market_base_vol + 
-                      market_skew * moneyness + 
-                      market_smile * moneyness**2 +
-                      term_structure * time_factor)
-                
-                # Ensure volatility is positive
-                market_vol_surface[i, j] = max(vol, 0.05)  # Minimum 5% vol
-        
-        # Create 3D surface plot for market volatility
-        market_fig = go.Figure()
-        
-        market_fig.add_trace(go.Surface(
-            x=market_strikes,
-            y=market_days,
-            z=market_vol_surface * 100,
-            colorscale='Plasma',
-            showscale=True,
-            name="Market Implied Volatility",
-            hovertemplate='<b>Strike:</b> $%{x:.2f}<br><b>Days:</b> %{y:.0f}<br><b>Implied Vol:</b> %{z:.2f}%<extra></extra>'
-        ))
-        
-        market_fig.update_layout(
-            title=f'Market Implied Volatility Surface{f" - {market_symbol}" if market_symbol else ""}<br>Spot: ${market_spot:.2f}, Base Vol: {market_base_vol*100:.1f}%',
-            scene=dict(
-                xaxis_title='Strike Price ($)',
-                yaxis_title='Days to Expiration',
-                zaxis_title='Implied Volatility (%)',
-                camera=dict(
-                    eye=dict(x=1.5, y=1.5, z=1.5)
-                )
-            ),
-            height=600,
-            margin=dict(l=0, r=0, b=0, t=80)
-        )
+        if 'market_surface_fig' not in st.session_state:
+            skeleton = go.Figure()
+            skeleton.add_trace(go.Surface(
+                colorscale='Plasma',
+                showscale=True,
+                name="Market Implied Volatility",
+                hovertemplate='<b>Strike:</b> $%{x:.2f}<br><b>Days:</b> %{y:.0f}<br><b>Implied Vol:</b> %{z:.2f}%<extra></extra>'
+            ))
+            skeleton.update_layout(
+                scene=dict(
+                    xaxis_title='Strike Price ($)',
+                    yaxis_title='Days to Expiration',
+                    zaxis_title='Implied Volatility (%)',
+                    camera=dict(
+                        eye=dict(x=1.5, y=1.5, z=1.5)
+                    )
+                ),
+                height=600,
+                margin=dict(l=0, r=0, b=0, t=80)
+            )
+            st.session_state.market_surface_fig = skeleton
+        market_fig = st.session_state.market_surface_fig
+        
+        # Only patch the session's figure when the surface inputs have changed
+        market_fig_params = (market_spot, market_strike_min, market_strike_max, market_days_min, market_days_max,
+                             market_base_vol, market_skew, market_smile, term_structure, market_resolution, market_symbol)
+        if st.session_state.get('market_surface_fig_params') != market_fig_params:
+            # Generate market volatility surface data
+            market_n_strikes, market_n_days = SURFACE_RESOLUTIONS[market_resolution]
+            market_strikes, market_days, market_vol_surface = _vol_surface(
+                market_spot, market_strike_min, market_strike_max, market_days_min, market_days_max,
+                market_base_vol, market_skew, market_smile, term_structure, market_n_strikes, market_n_days
+            )
+            
+            market_fig.update_traces(
+                x=market_strikes,
+                y=market_days,
+                z=market_vol_surface * 100,
+                selector=dict(type='surface')
+            )
+            market_fig.update_layout(
+                title=f'Market Implied Volatility Surface{f" - {market_symbol}" if market_symbol else ""}<br>Spot: ${market_spot:.2f}, Base Vol: {market_base_vol*100:.1f}%'
+            )
+            
+            st.session_state.market_surface_fig_params = market_fig_params
         
         st.plotly_chart(market_fig, use_container_width=True, key="market_volatility_surface")
         